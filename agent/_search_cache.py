@@ -0,0 +1,61 @@
+import asyncio
+import hashlib
+
+from cachetools import TTLCache
+
+from agent.tavily_search import tavily_search
+
+_CACHE_MAXSIZE = 1024
+_CACHE_TTL_SECONDS = 3600
+
+_cache: TTLCache = TTLCache(maxsize=_CACHE_MAXSIZE, ttl=_CACHE_TTL_SECONDS)
+_locks: dict[str, asyncio.Lock] = {}
+
+
+def _cache_key(query: str, search_depth: str) -> str:
+    """
+    Builds the cache key for a (query, depth) pair.
+
+    Args:
+        query: The search query.
+        search_depth: Either "basic" or "advanced".
+
+    Returns:
+        A hex digest uniquely identifying the query/depth combination.
+    """
+    return hashlib.sha256(f"{search_depth}|{query}".encode()).hexdigest()
+
+
+async def cached_search(query: str, search_depth: str = "basic") -> tuple[str, dict]:
+    """
+    Memoized wrapper around `tavily_search` with a TTL-bounded cache.
+
+    Identical subqueries repeat across sessions and across the
+    critique-retry loop; a cache hit skips the network round-trip
+    entirely. A per-key lock dedupes concurrent requests for the same
+    query so only one of them actually hits the API.
+
+    Args:
+        query: The search query.
+        search_depth: Either "basic" or "advanced", determines depth of results.
+
+    Returns:
+        A tuple of the formatted search results context and a confidence
+        dict, as produced by `tavily_search`.
+    """
+    key = _cache_key(query, search_depth)
+    if key in _cache:
+        return _cache[key]
+    lock = _locks.setdefault(key, asyncio.Lock())
+    async with lock:
+        # Another task may have populated the entry while we waited.
+        if key in _cache:
+            return _cache[key]
+        try:
+            result = await tavily_search(query, search_depth=search_depth)
+            _cache[key] = result
+            return result
+        finally:
+            # Drop the lock entry even when the search raises, so failed
+            # keys don't accumulate in the module-level dict.
+            _locks.pop(key, None)
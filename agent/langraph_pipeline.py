@@ -1,17 +1,47 @@
+import asyncio
+import hashlib
+import textwrap
+from cachetools import TTLCache
 from langgraph.graph import StateGraph, START, END
-from agent.tavily_search import tavily_search
-from agent.llm_response import LLM
+from agent._search_cache import cached_search
+from agent.llm_response import LLM, build_answer_prompt
+from agent import ragcache, semantic_cache
 from langgraph.checkpoint.memory import MemorySaver
 from IPython.display import Image, display
 from typing import TypedDict
 from util import pretty_print
 
+# Upper bound on concurrent Tavily requests to stay within API rate limits.
+MAX_CONCURRENT_SEARCHES = 5
+
+# Hard cap on subqueries dispatched to search; each one is a billable call.
+MAX_SUBQUERY_FANOUT = 8
+
+# How many times a flagged response may be regenerated before publishing
+# anyway; keeps a persistently negative critique from looping forever.
+MAX_REVISIONS = 1
+
+# Retrieval confidence thresholds above which the critique call is skipped.
+CONFIDENCE_TOP_SCORE = 0.9
+CONFIDENCE_MIN_SOURCES = 3
+
+# Static critique instructions come first so provider-side prompt caching
+# can match the prefix; the per-request query, context, and response follow.
+_CRITIQUE_PREFIX = """You are a helpful assistant tasked with reviewing and improving an AI-generated response.
+Please check the response for accuracy, clarity, and completeness. If the original response is already excellent, return the word ok.
+Otherwise, return the word inaccurate.
+"""
+
 class AgentState(TypedDict):
     query: str
     subqueries: list[str]
+    subquery_contexts: list[str]
     combined_context: str
+    retrieval_confidence: dict
     response: str
     revised_response: str
+    revision_count: int
+    cache_hit: bool
 
 
 class TavilyRAGPipeline:
@@ -26,9 +56,30 @@ class TavilyRAGPipeline:
         """
         self.show_subqueries = show_subqueries
         self.llm = LLM()
+        # Keyed by the subquery set; lets critique retries reuse the
+        # assembled context instead of re-running retrieval.
+        self._ctx_cache = TTLCache(maxsize=128, ttl=3600)
         self.graph = self._build_graph()
 
     # Nodes
+    def _semantic_cache_node(self, state: AgentState) -> dict:
+        """
+        Check the semantic cache for a prior answer to an equivalent query.
+
+        Args:
+            state (AgentState): The current agent state containing the user query.
+
+        Returns:
+            Dict[str, Any]: Cached response and hit flag, or a miss marker.
+        """
+        cached = semantic_cache.maybe_hit(state["query"])
+        if cached is not None:
+            return {"response": cached, "cache_hit": True}
+        # Entry point of every fresh run: clear the revision budget so a
+        # flagged answer on a previous query (same checkpointer thread)
+        # doesn't eat this one's retries.
+        return {"cache_hit": False, "revision_count": 0}
+
     def _query_parser_node(self, state: AgentState) -> dict:
         """
         Decompose the input query into subqueries.
@@ -54,20 +105,122 @@ class TavilyRAGPipeline:
         Returns:
             Dict[str, str]: Dictionary with the combined search context.
         """
-        snippets = []
-        for subquery in state["subqueries"]:
-            if self.show_subqueries and len(state["subqueries"]) > 1:
+        subqueries = state["subqueries"]
+        # Drop near-identical duplicates (normalized exact match, order
+        # preserved) and cap the fan-out before anything is dispatched.
+        unique = {}
+        for subquery in subqueries:
+            unique.setdefault(subquery.lower().strip().rstrip("?"), subquery)
+        deduped = list(unique.values())[:MAX_SUBQUERY_FANOUT]
+        if self.show_subqueries and len(deduped) < len(subqueries):
+            pretty_print(
+                f"Dropped {len(subqueries) - len(deduped)} duplicate or excess subqueries",
+                subtext="Dedup",
+                color="93",
+            )
+        subqueries = deduped
+
+        ctx_key = hashlib.sha256("|".join(sorted(subqueries)).encode()).hexdigest()
+        cached = self._ctx_cache.get(ctx_key)
+        if cached is not None:
+            combined_context, contexts, confidence = cached
+            return {
+                "subqueries": subqueries,
+                "combined_context": combined_context,
+                "subquery_contexts": contexts,
+                "retrieval_confidence": confidence,
+            }
+
+        if self.show_subqueries and len(subqueries) > 1:
+            for subquery in subqueries:
                 pretty_print(subquery, subtext="Sub Query", color="92")
-            use_advanced = len(subquery.split()) > 8 or len(state["subqueries"]) > 3
-            depth = "advanced" if use_advanced else "basic"
-            context = await tavily_search(subquery, search_depth=depth)
-            snippets.append(context)
+
+        depths = [
+            "advanced" if len(subquery.split()) > 8 or len(subqueries) > 3 else "basic"
+            for subquery in subqueries
+        ]
+        semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+
+        async def bounded_search(subquery: str, depth: str) -> str:
+            async with semaphore:
+                return await cached_search(subquery, search_depth=depth)
+
+        tasks = [bounded_search(subquery, depth) for subquery, depth in zip(subqueries, depths)]
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        snippets = []
+        contexts = []
+        confidences = []
+        had_errors = False
+        for subquery, result in zip(subqueries, results):
+            if isinstance(result, Exception):
+                had_errors = True
+                pretty_print(str(result), subtext="Search Error", color="91")
+                contexts.append("No relevant information found.")
+                confidences.append({"top_score": 0.0, "n_confident": 0})
+            else:
+                context, confidence = result
+                snippets.append(context)
+                contexts.append(context)
+                confidences.append(confidence)
         combined_context = "\n\n".join(snippets)
+        # The weakest subquery bounds overall confidence.
+        retrieval_confidence = {
+            "top_score": min((c["top_score"] for c in confidences), default=0.0),
+            "n_confident": min((c["n_confident"] for c in confidences), default=0),
+        }
+        # Don't cache a context degraded by transient search failures;
+        # the next attempt (including a critique retry) should re-fetch.
+        if not had_errors:
+            self._ctx_cache[ctx_key] = (combined_context, contexts, retrieval_confidence)
+        return {
+            "subqueries": subqueries,
+            "combined_context": combined_context,
+            "subquery_contexts": contexts,
+            "retrieval_confidence": retrieval_confidence,
+        }
+
+    async def _batch_llm_node(self, state: AgentState) -> dict:
+        """
+        Answer each subquery from its own context in one batched LLM call.
+
+        For wide fan-outs a single abatch call produces per-subquery
+        mini-answers in roughly one round-trip; the llm node then
+        synthesizes the final answer from them instead of the raw
+        search context.
+
+        Args:
+            state (AgentState): Agent state with subqueries and their contexts.
+
+        Returns:
+            Dict[str, str]: Dictionary with the mini-answers as the new context.
+        """
+        subqueries = state["subqueries"]
+        contexts = state["subquery_contexts"]
+        answers = [
+            ragcache.get_answer(subquery, context)
+            for subquery, context in zip(subqueries, contexts)
+        ]
+        misses = [i for i, answer in enumerate(answers) if answer is None]
+        if misses:
+            prompts = [build_answer_prompt(subqueries[i], contexts[i]) for i in misses]
+            fresh = await self.llm.generate_answers_batch(prompts)
+            for i, answer in zip(misses, fresh):
+                ragcache.store_answer(subqueries[i], contexts[i], answer)
+                answers[i] = answer
+        combined_context = "\n\n".join(
+            f"{subquery}\n{answer}" for subquery, answer in zip(subqueries, answers)
+        )
         return {"combined_context": combined_context}
 
-    def _llm_node(self, state: AgentState) -> dict:
+
+    async def _llm_node(self, state: AgentState) -> dict:
         """
-        Generate the final answer using the LLM and combined context.
+        Stream the final answer from the LLM as tokens arrive.
+
+        Tokens are printed incrementally so the user sees output at
+        first-token latency, and accumulated into the full response for
+        the rest of the graph.
 
         Args:
             state (AgentState): Agent state with query and combined context.
@@ -75,49 +228,105 @@ class TavilyRAGPipeline:
         Returns:
             Dict[str, str]: Dictionary with the generated LLM response.
         """
-        response = self.llm.generate_answer(
+        pretty_print("", subtext="AI Response", color="96")
+        chunks = []
+        async for token in self.llm.generate_answer_stream(
             question=state["query"],
             context=state["combined_context"],
-            stream=False,
-        )
-        response = "".join(chunk for chunk in response)
+        ):
+            self._print_wrapped_under_bar(token, 80)
+            chunks.append(token)
+        response = "".join(chunks)
         return {"response": response}
 
-    def _critique_and_revise_node(self, state: AgentState) -> dict:
-        critique_prompt = f"""
-        You are a helpful assistant tasked with reviewing and improving an AI-generated response.
-        Here is the original query:
-        {state['query']}
+    async def _critique_async(self, state: AgentState) -> str:
+        critique_prompt = (
+            f"{_CRITIQUE_PREFIX}\n"
+            f"Original query:\n{state['query']}\n\n"
+            f"Context:\n{state['combined_context']}\n\n"
+            f"Response:\n{state['response']}\n"
+        )
+        return await self.llm.a_generate(critique_prompt)
+
+
+    async def _speculative_publish_node(self, state: AgentState) -> dict:
+        """
+        Finish publishing the streamed response while the critique runs.
+
+        The critique verdict is the common-case bottleneck after the user
+        has already seen the streamed answer, so it runs as a concurrent
+        task while the output buffer is flushed; if the verdict comes back
+        negative the graph routes back through search for a revision.
 
-        Here is the context provided for answering:
-        {state['combined_context']}
+        Args:
+            state (AgentState): Agent state with the drafted response.
+
+        Returns:
+            Dict[str, str]: Dictionary with the critique verdict.
+        """
+        critique_task = asyncio.create_task(self._critique_async(state))
+        # The response body already streamed to the user in the llm node;
+        # only the tail of the wrap buffer is left to flush.
+        self._flush_wrapped_buffer()
+        revised_response = await critique_task
+        updates = {"revised_response": revised_response}
+        if "inaccurate" in revised_response.lower():
+            revision_count = state.get("revision_count", 0) + 1
+            updates["revision_count"] = revision_count
+            if revision_count <= MAX_REVISIONS:
+                pretty_print("Critique flagged the response, revising...", subtext="Revision", color="93")
+        elif not state.get("cache_hit"):
+            semantic_cache.store(state["query"], state["response"])
+        return updates
+
+
+    def _fast_publish_node(self, state: AgentState) -> dict:
+        """
+        Finish publishing a high-confidence response without a critique.
 
-        And here is the response to review:
-        {state['response']}
+        Args:
+            state (AgentState): Agent state with the streamed response.
 
-        Please check the response for accuracy, clarity, and completeness. If the original response is already excellent, return the word ok.
-        Otherwise, return the word inaccurate.
+        Returns:
+            Dict[str, str]: Dictionary with an ok verdict.
         """
-        revised_response = self.llm.generate_answer(
-            question=critique_prompt,
-            context=state["combined_context"],
-            stream=False,
-        )
-        return {"revised_response": revised_response}
-    
+        self._flush_wrapped_buffer()
+        if not state.get("cache_hit"):
+            semantic_cache.store(state["query"], state["response"])
+        return {"revised_response": "ok"}
+
 
     def _publish_node(self, state: AgentState) -> dict:
         pretty_print("", subtext="AI Response", color="96")
         self._print_wrapped_under_bar(state['response'], 80)
-        # Print any remaining buffer
-        if hasattr(self, "_char_buffer") and self._char_buffer.strip():
-            print(self._char_buffer.strip() + "\n")
-            del self._char_buffer
+        self._flush_wrapped_buffer()
+        if not state.get("cache_hit"):
+            semantic_cache.store(state["query"], state["response"])
         return {"response": state["response"]}
 
 
     def _critique_condition(self, state: AgentState) -> str:
-        return "search_context" if "inaccurate" in state["response"].lower() else "publish"
+        flagged = "inaccurate" in state["revised_response"].lower()
+        if flagged and state.get("revision_count", 0) <= MAX_REVISIONS:
+            return "search_context"
+        return "publish"
+
+
+    def _semantic_cache_condition(self, state: AgentState) -> str:
+        return "publish" if state.get("cache_hit") else "parse"
+
+
+    def _fanout_condition(self, state: AgentState) -> str:
+        return "batch_llm" if len(state["subqueries"]) > 3 else "llm"
+
+
+    def _needs_critique(self, state: AgentState) -> str:
+        confidence = state.get("retrieval_confidence") or {}
+        high_confidence = (
+            confidence.get("top_score", 0.0) >= CONFIDENCE_TOP_SCORE
+            and confidence.get("n_confident", 0) >= CONFIDENCE_MIN_SOURCES
+        )
+        return "fast_publish" if high_confidence else "critique"
 
 
     def _build_graph(self):
@@ -131,26 +340,52 @@ class TavilyRAGPipeline:
         #Using RAM memory instead of disk for simplicity and efficiency, works good because the project runs locally
         memory = MemorySaver()
 
+        builder.add_node("semantic_cache", self._semantic_cache_node)
         builder.add_node("parse", self._query_parser_node)
         builder.add_node("search_context", self._search_and_context_node, is_async=True)
-        builder.add_node("llm", self._llm_node)
-        builder.add_node("critique_and_revise", self._critique_and_revise_node)
+        builder.add_node("batch_llm", self._batch_llm_node, is_async=True)
+        builder.add_node("llm", self._llm_node, is_async=True)
+        builder.add_node("speculative_publish", self._speculative_publish_node, is_async=True)
+        builder.add_node("fast_publish", self._fast_publish_node)
         builder.add_node("publish", self._publish_node)
 
-        builder.add_edge(START, "parse")
+        builder.add_edge(START, "semantic_cache")
+        builder.add_conditional_edges(
+            "semantic_cache",
+            self._semantic_cache_condition,
+            {
+                "parse": "parse",
+                "publish": "publish"
+            }
+        )
         builder.add_edge("parse", "search_context")
-        builder.add_edge("search_context", "llm")
-        builder.add_edge("llm", "critique_and_revise")
-        builder.add_edge("critique_and_revise", "publish")
+        builder.add_conditional_edges(
+            "search_context",
+            self._fanout_condition,
+            {
+                "batch_llm": "batch_llm",
+                "llm": "llm"
+            }
+        )
+        builder.add_edge("batch_llm", "llm")
+        builder.add_conditional_edges(
+            "llm",
+            self._needs_critique,
+            {
+                "critique": "speculative_publish",
+                "fast_publish": "fast_publish"
+            }
+        )
+        builder.add_edge("fast_publish", END)
         builder.add_edge("publish", END)
 
-        
+
         builder.add_conditional_edges(
-            "critique_and_revise",
+            "speculative_publish",
             self._critique_condition,
             {
                 "search_context": "search_context",
-                "publish": "publish"
+                "publish": END
             }
         )
 
@@ -169,22 +404,50 @@ class TavilyRAGPipeline:
 
     def _print_wrapped_under_bar(self, text: str, max_width: int = 80):
         """
-        Wraps and prints text to stdout when line length exceeds max_width.
+        Wraps and prints streamed text to stdout bounded by max_width.
+
+        Newlines are honoured as explicit break points so the model's
+        paragraph structure survives streaming. Within a line, completed
+        width-bounded pieces are printed immediately and only the
+        trailing partial line is buffered, keeping the cost linear in
+        the total streamed characters.
 
         Args:
             text (str): Text to print in a wrapped format.
             max_width (int): Maximum characters per line before wrapping.
         """
-        if not hasattr(self, "_char_buffer"):
-            self._char_buffer = ""
-        self._char_buffer += text
-        while len(self._char_buffer) >= max_width:
-            break_idx = self._char_buffer.rfind(" ", 0, max_width)
+        if not hasattr(self, "_wrap"):
+            self._wrap = textwrap.TextWrapper(
+                width=max_width, break_long_words=False, replace_whitespace=False
+            )
+            self._tail = ""
+        buffered = self._tail + text
+        # Everything up to the last newline is complete; print it line by
+        # line, keeping blank lines between paragraphs.
+        newline_idx = buffered.rfind("\n")
+        if newline_idx != -1:
+            for line in buffered[:newline_idx].split("\n"):
+                print(self._wrap.fill(line) if line.strip() else "")
+            buffered = buffered[newline_idx + 1:]
+        while len(buffered) >= max_width:
+            break_idx = buffered.rfind(" ", 0, max_width)
             if break_idx == -1:
                 break_idx = max_width
-            line = self._char_buffer[:break_idx].rstrip()
-            print(line)
-            self._char_buffer = self._char_buffer[break_idx:].lstrip()
+            line = buffered[:break_idx].rstrip()
+            if line:
+                print(line)
+            buffered = buffered[break_idx:].lstrip(" ")
+        self._tail = buffered
+
+
+    def _flush_wrapped_buffer(self):
+        """
+        Prints whatever partial line is still buffered and resets it.
+        """
+        if hasattr(self, "_tail"):
+            if self._tail.strip():
+                print(self._wrap.fill(self._tail.strip()) + "\n")
+            self._tail = ""
 
 
     def get_graph(self):
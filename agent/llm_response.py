@@ -1,9 +1,36 @@
 import os
 import json
+import hashlib
 from langchain_cohere import ChatCohere
 from langchain.schema import HumanMessage
+from diskcache import Cache
 import re
 
+# On-disk cache for query decompositions; diskcache keeps a memory layer
+# on top so repeated lookups within a session stay cheap.
+_SUBQUERY_CACHE = Cache(".cache/subq")
+
+# Strips markdown code fences from LLM output before JSON parsing.
+_FENCE_RE = re.compile(r"```(?:json)?\s*")
+
+# Static instruction prefix kept byte-identical across requests so
+# provider-side prompt caching can match it before the variable content.
+ANSWER_PREFIX = "Answer the prompt based on the context.\n"
+
+
+def build_answer_prompt(question: str, context: str) -> str:
+    """
+    Builds an answer prompt with the static instructions first.
+
+    Args:
+        question (str): The user question.
+        context (str): The background context to base the answer on.
+
+    Returns:
+        str: The full prompt, static prefix followed by context and question.
+    """
+    return f"{ANSWER_PREFIX}Context:\n{context}\n\nPrompt: {question}"
+
 class LLM:
     def __init__(self, model_name: str = "command-r", temperature: float = 0.3, streaming: bool = True):
         """
@@ -18,21 +45,28 @@ class LLM:
         self.temperature = temperature
         self.streaming = streaming
         self.api_key = os.getenv("COHERE_API_KEY")
+        self._client = None
 
 
     def _get_client(self):
         """
-        Instantiate a Cohere chat client using current settings.
+        Return the Cohere chat client, creating it once on first use.
+
+        The client (and its underlying HTTP connection pool) is reused
+        across subquery, answer, and critique calls instead of being
+        rebuilt per request.
 
         Returns:
             ChatCohere: A configured LangChain Cohere chat client.
         """
-        return ChatCohere(
-            cohere_api_key=self.api_key,
-            model=self.model_name,
-            temperature=self.temperature,
-            streaming=self.streaming
-        )
+        if self._client is None:
+            self._client = ChatCohere(
+                cohere_api_key=self.api_key,
+                model=self.model_name,
+                temperature=self.temperature,
+                streaming=self.streaming
+            )
+        return self._client
 
 
     def __call__(self, messages: list[HumanMessage], stream: bool = False) -> str:
@@ -49,11 +83,11 @@ class LLM:
         client = self._get_client()
         if stream:
             streamed_response = client.stream(messages)
-            collected = ""
+            collected = []
             for chunk in streamed_response:
                 token = chunk.content if hasattr(chunk, "content") else ""
-                collected += token
-            return collected
+                collected.append(token)
+            return "".join(collected)
         else:
             return client(messages).content
 
@@ -70,15 +104,84 @@ class LLM:
         Returns:
             str: The generated answer.
         """
-        prompt = f"""
-                Answer the prompt based on the context.\nContext:\n{context}\n\nPrompt: {question}
-            """
+        prompt = build_answer_prompt(question, context)
         try:
             return self([HumanMessage(content=prompt)], stream=False)
         except Exception as e:
             raise Exception(f"[Error calling Cohere: {e}]")
 
 
+    async def a_generate(self, prompt: str) -> str:
+        """
+        Asynchronously generate a completion for a fully-formed prompt.
+
+        The prompt is sent as-is, so callers that lay out their own
+        static prefix keep it at the start of the transmitted request.
+        Uses the client's native ainvoke so the call releases the event
+        loop for concurrent graph work instead of blocking a thread.
+
+        Args:
+            prompt (str): The complete prompt to send to the model.
+
+        Returns:
+            str: The generated response.
+        """
+        try:
+            response = await self._get_client().ainvoke([HumanMessage(content=prompt)])
+            return response.content
+        except Exception as e:
+            raise Exception(f"[Error calling Cohere: {e}]")
+
+
+    async def generate_answers_batch(self, prompts: list[str]) -> list[str]:
+        """
+        Answer several prompts in one batched Cohere call.
+
+        Batching lets the provider pipeline the requests server-side, so
+        N prompts cost roughly one HTTP round-trip instead of N.
+
+        Args:
+            prompts (List[str]): Fully-formed prompts to answer.
+
+        Returns:
+            List[str]: One generated answer per prompt, in order.
+        """
+        client = self._get_client()
+        try:
+            responses = await client.abatch(
+                [[HumanMessage(content=prompt)] for prompt in prompts]
+            )
+            return [response.content for response in responses]
+        except Exception as e:
+            raise Exception(f"[Error calling Cohere: {e}]")
+
+
+    async def generate_answer_stream(self, question: str, context: str):
+        """
+        Stream an answer token-by-token based on a question and context.
+
+        Yields chunks as they arrive from the model so callers can show
+        output at first-token latency instead of waiting for the full
+        generation.
+
+        Args:
+            question (str): The user question.
+            context (str): The background context to base the answer on.
+
+        Yields:
+            str: The next chunk of the generated answer.
+        """
+        prompt = build_answer_prompt(question, context)
+        client = self._get_client()
+        try:
+            async for chunk in client.astream([HumanMessage(content=prompt)]):
+                token = chunk.content if hasattr(chunk, "content") else ""
+                if token:
+                    yield token
+        except Exception as e:
+            raise Exception(f"[Error calling Cohere: {e}]")
+
+
     def generate_subqueries(self, query: str, max_subqueries: int = 15) -> list[str]:
         """
         Use the LLM to split a complex query into simpler sub-queries.
@@ -90,6 +193,24 @@ class LLM:
         Returns:
             List[str]: A list of simplified subqueries.
         """
+        # Short, conjunction-free queries are single questions; skip the
+        # LLM round-trip entirely for them.
+        sep_count = sum(query.lower().count(sep) for sep in (" and ", " or ", ";", ","))
+        if len(query.split()) < 15 and sep_count == 0 and query.count("?") <= 1:
+            return [query]
+
+        # Decomposition is near-deterministic at low temperature, so cache
+        # parsed results on disk; skip the cache when sampling is too random.
+        cache_key = None
+        if self.temperature <= 0.5:
+            normalized = query.strip().lower()
+            cache_key = hashlib.sha256(
+                f"{normalized}|{max_subqueries}|{self.model_name}|{self.temperature}".encode()
+            ).hexdigest()
+            cached = _SUBQUERY_CACHE.get(cache_key)
+            if cached is not None:
+                return cached
+
         prompt = f"""
         You are a helpful assistant that splits a complex user query into multiple simpler sub-queries.
         Only split the query if it contains multiple distinct questions or requests.
@@ -111,11 +232,14 @@ class LLM:
         """
         try:
             raw_response = self([HumanMessage(content=prompt)])
-            cleaned = re.sub(r"```(?:json)?\s*", "", raw_response.strip()) 
+            cleaned = _FENCE_RE.sub("", raw_response.strip())
             cleaned_response = cleaned.rstrip("`") 
             parsed = json.loads(cleaned_response)
             if isinstance(parsed, list) and all(isinstance(q, str) for q in parsed):
-                return parsed[:max_subqueries]
+                subqueries = parsed[:max_subqueries]
+                if cache_key is not None:
+                    _SUBQUERY_CACHE.set(cache_key, subqueries)
+                return subqueries
         except Exception:
             print("\nError parsing subqueries response, returning original query.\n")
             pass
@@ -0,0 +1,54 @@
+import hashlib
+from typing import Optional
+
+from cachetools import TTLCache
+
+_CACHE_MAXSIZE = 512
+_CACHE_TTL_SECONDS = 24 * 3600
+
+# LRU-evicting, TTL-bounded store of per-subquery answer fragments.
+_cache: TTLCache = TTLCache(maxsize=_CACHE_MAXSIZE, ttl=_CACHE_TTL_SECONDS)
+
+
+def _answer_key(subquery: str, context: str) -> str:
+    """
+    Builds the cache key for a (subquery, context) pair.
+
+    Hashing the context alongside the subquery doubles as invalidation:
+    if retrieval returns different sources, the key changes and the
+    stale answer is never served.
+
+    Args:
+        subquery: The subquery that was answered.
+        context: The formatted search context the answer was based on.
+
+    Returns:
+        A hex digest uniquely identifying the pair.
+    """
+    return hashlib.sha256(f"{subquery}|{context}".encode()).hexdigest()
+
+
+def get_answer(subquery: str, context: str) -> Optional[str]:
+    """
+    Returns the cached mini-answer for a subquery, if still valid.
+
+    Args:
+        subquery: The subquery to look up.
+        context: The formatted search context for the subquery.
+
+    Returns:
+        The cached answer, or None on a miss.
+    """
+    return _cache.get(_answer_key(subquery, context))
+
+
+def store_answer(subquery: str, context: str, answer: str) -> None:
+    """
+    Records a generated mini-answer for reuse across queries and retries.
+
+    Args:
+        subquery: The subquery that was answered.
+        context: The formatted search context the answer was based on.
+        answer: The generated answer fragment.
+    """
+    _cache[_answer_key(subquery, context)] = answer
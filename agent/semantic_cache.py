@@ -0,0 +1,121 @@
+import os
+from typing import Optional
+
+import numpy as np
+from langchain_cohere import CohereEmbeddings
+
+# Minimum cosine similarity for a prior query to count as a hit.
+SIMILARITY_THRESHOLD = 0.98
+EMBED_MODEL = "embed-english-v3.0"
+
+# Bound on stored entries (oldest dropped first) and the step the
+# embedding matrix grows by, so stores don't copy the matrix every time.
+MAX_ENTRIES = 256
+_GROW_CHUNK = 32
+
+_embeddings: Optional[CohereEmbeddings] = None
+_vectors: Optional[np.ndarray] = None
+_size = 0
+_responses: list[str] = []
+
+# One-entry memo of the last embedded query, so the store() at publish
+# time reuses the vector maybe_hit() computed at the start of the run.
+_last_embed: Optional[tuple[str, np.ndarray]] = None
+
+
+def _get_embeddings() -> CohereEmbeddings:
+    """
+    Lazily creates and returns a shared Cohere embeddings client.
+
+    Returns:
+        The module-level CohereEmbeddings singleton.
+    """
+    global _embeddings
+    if _embeddings is None:
+        _embeddings = CohereEmbeddings(
+            cohere_api_key=os.getenv("COHERE_API_KEY"),
+            model=EMBED_MODEL,
+        )
+    return _embeddings
+
+
+def _embed(query: str) -> np.ndarray:
+    """
+    Embeds a query and L2-normalizes the vector so dot products are cosines.
+
+    Args:
+        query: The text to embed.
+
+    Returns:
+        A 1-D normalized embedding vector.
+    """
+    global _last_embed
+    if _last_embed is not None and _last_embed[0] == query:
+        return _last_embed[1]
+    vector = np.asarray(_get_embeddings().embed_query(query), dtype=np.float32)
+    norm = np.linalg.norm(vector)
+    if norm:
+        vector = vector / norm
+    _last_embed = (query, vector)
+    return vector
+
+
+def maybe_hit(query: str) -> Optional[str]:
+    """
+    Looks up a semantically equivalent prior query and returns its response.
+
+    Saves the entire embed-search-LLM pipeline for repeat or paraphrased
+    queries. A single matmul against the (N, d) matrix of stored
+    embeddings finds the nearest neighbour.
+
+    Args:
+        query: The incoming user query.
+
+    Returns:
+        The cached final response if a prior query is similar enough,
+        otherwise None.
+    """
+    if _vectors is None or _size == 0:
+        return None
+    try:
+        vector = _embed(query)
+    except Exception:
+        # The cache must never break the pipeline; treat failures as misses.
+        return None
+    similarities = _vectors[:_size] @ vector
+    best = int(np.argmax(similarities))
+    if similarities[best] >= SIMILARITY_THRESHOLD:
+        return _responses[best]
+    return None
+
+
+def store(query: str, response: str) -> None:
+    """
+    Records a finished (query, response) pair for future lookups.
+
+    Args:
+        query: The user query that produced the response.
+        response: The final pipeline response to cache.
+    """
+    global _vectors, _size
+    try:
+        vector = _embed(query)
+    except Exception:
+        return
+    if _vectors is None:
+        _vectors = np.empty((_GROW_CHUNK, vector.shape[0]), dtype=np.float32)
+    elif _size == MAX_ENTRIES:
+        # Full: drop the oldest entry by shifting rows up one slot.
+        _vectors[:-1] = _vectors[1:]
+        _responses.pop(0)
+        _size -= 1
+    elif _size == len(_vectors):
+        grown = np.empty(
+            (min(len(_vectors) + _GROW_CHUNK, MAX_ENTRIES), _vectors.shape[1]),
+            dtype=np.float32,
+        )
+        grown[:_size] = _vectors[:_size]
+        _vectors = grown
+    _vectors[_size] = vector
+    _responses.append(response)
+    _size += 1
@@ -1,35 +1,42 @@
+import heapq
 import os
 from tavily import AsyncTavilyClient
 from tenacity import retry, stop_after_attempt, wait_exponential, retry_if_exception_type
-from typing import Any, Callable, Coroutine, Optional
-import asyncio
+from typing import Optional
 
 TAVILY_API_KEY: Optional[str] = os.getenv("TAVILY_API_KEY")
 
+_client: Optional[AsyncTavilyClient] = None
+
 
 class TavilySearchError(Exception):
     """Custom exception raised for Tavily search-related errors."""
     pass
 
 
-def retry_async(*dargs: Any, **dkwargs: Any) -> Callable:
+def _get_client() -> AsyncTavilyClient:
     """
-    Decorator to apply retry logic to async functions using tenacity.
+    Lazily creates and returns a shared AsyncTavilyClient instance.
+
+    Reusing one client pools TCP connections across searches instead of
+    paying for a new client and TLS handshake on every call.
 
-    Wraps the function in `asyncio.coroutine()` so `tenacity.retry` can be applied to it.
+    Returns:
+        The module-level AsyncTavilyClient singleton.
     """
-    def wrapper(fn: Callable[..., Coroutine]) -> Callable[..., Coroutine]:
-        return retry(*dargs, **dkwargs)(asyncio.coroutine(fn))
-    return wrapper
+    global _client
+    if _client is None:
+        _client = AsyncTavilyClient(TAVILY_API_KEY)
+    return _client
 
 
-@retry_async(
+@retry(
     reraise=True,
     stop=stop_after_attempt(3),
     wait=wait_exponential(multiplier=1, min=2, max=10),
     retry=retry_if_exception_type(TavilySearchError)
 )
-async def tavily_search(query: str, search_depth: str = "basic") -> str:
+async def tavily_search(query: str, search_depth: str = "basic") -> tuple[str, dict]:
     """
     Performs an async search using the Tavily API with retries.
 
@@ -38,14 +45,15 @@ async def tavily_search(query: str, search_depth: str = "basic") -> str:
         search_depth: Either "basic" or "advanced", determines depth of results.
 
     Returns:
-        A string representing formatted search results context.
+        A tuple of the formatted search results context and a confidence
+        dict with the top score and number of confident sources.
     """
     if len(query) > 400:
         raise TavilySearchError("Query is too long. Max query length is 400 characters.")
     if not TAVILY_API_KEY:
         raise TavilySearchError("Tavily API key not found.")
     try:
-        client = AsyncTavilyClient(TAVILY_API_KEY)
+        client = _get_client()
         response = await client.search(
             query=query,
             search_depth=search_depth, 
@@ -58,7 +66,7 @@ async def tavily_search(query: str, search_depth: str = "basic") -> str:
         raise TavilySearchError(f"[Tavily SDK Error] {e}")
 
 
-def format_context_from_tavily(response: dict, score_max_diff: float = 0.08, max_results: int = 4) -> str:
+def format_context_from_tavily(response: dict, score_max_diff: float = 0.08, max_results: int = 4) -> tuple[str, dict]:
     """
     Filters and formats search results from Tavily response.
 
@@ -68,17 +76,20 @@ def format_context_from_tavily(response: dict, score_max_diff: float = 0.08, max
         max_results: Number of top results to include.
 
     Returns:
-        A formatted string containing relevant content snippets.
+        A tuple of the formatted snippet string and a confidence dict
+        with "top_score" (best result score) and "n_confident" (number
+        of results that passed the score filter).
     """
+    no_confidence = {"top_score": 0.0, "n_confident": 0}
     results = response.get("results", [])
     if not results:
-        return "No relevant information found."
+        return "No relevant information found.", no_confidence
 
-    sorted_results = sorted(results, key=lambda r: r.get("score", 0), reverse=True)
-    top_score = sorted_results[0].get("score", 0)
-    filtered = [r for r in sorted_results if (top_score - r.get("score", 0)) <= score_max_diff][:max_results]
+    top = heapq.nlargest(max_results, results, key=lambda r: r.get("score", 0))
+    top_score = top[0].get("score", 0)
+    filtered = [r for r in top if (top_score - r.get("score", 0)) <= score_max_diff]
     if not filtered:
-        return "No high-confidence sources available."
+        return "No high-confidence sources available.", no_confidence
 
-    context_parts = [f"{r['title']}:\n{r['content']}\n\n" for r in filtered]
-    return "\n\n".join(context_parts)
+    context = "\n\n".join(f"{r['title']}:\n{r['content']}" for r in filtered)
+    return context, {"top_score": top_score, "n_confident": len(filtered)}
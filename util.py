@@ -1,7 +1,15 @@
+import sys
+
+_BAR = "=" * 80
+
+
 def pretty_print(text: str, subtext: str, color: str = "91") -> None:
     """
     Prints a formatted string to the console with colored and framed headers.
 
+    The whole block is assembled first and written with a single
+    sys.stdout.write so async callers only block on one flush.
+
     Args:
         text (str): The main content to print.
         subtext (str): A label for the printed content such as AI/Human message.
@@ -10,10 +18,9 @@ def pretty_print(text: str, subtext: str, color: str = "91") -> None:
     Returns:
         None
     """
-    bar = "=" * 80
     spaced_subtext = " " + subtext + " "
-    print(bar)
-    print(f"\033[{color}m" + spaced_subtext.center(len(bar), "=") + "\033[0m")
-    print(bar)
-    if text!= "":
-        print("\n" + text + "\n")
\ No newline at end of file
+    out = f"{_BAR}\n\033[{color}m{spaced_subtext.center(len(_BAR), '=')}\033[0m\n{_BAR}\n"
+    if text != "":
+        out += "\n" + text + "\n\n"
+    sys.stdout.write(out)
+    sys.stdout.flush()